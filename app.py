@@ -6,17 +6,56 @@ import seaborn as sns
 import tempfile
 import os
 #import shutil
-#import pandas as pd
+import pandas as pd
 import datetime
 import plotly.express as px
-
-
-
-
+import shared_store
+
+
+
+
+
+@st.cache_resource
+def get_shared_store():
+    """
+    Returns the process-wide store shared by every Streamlit session.
+    The memory budget and worker count can be set with the
+    CHAT_CACHE_MEMORY_MB and CHAT_ANALYSIS_WORKERS environment variables.
+    """
+    memory_budget_mb = int(os.environ.get('CHAT_CACHE_MEMORY_MB', 1024))
+    max_workers = int(os.environ.get('CHAT_ANALYSIS_WORKERS', max(1, (os.cpu_count() or 2) // 2)))
+    return shared_store.SharedStore(memory_budget_mb * 1024 * 1024, max_workers)
+
+def load_and_clean_chat(zip_file_paths):
+    """
+    Loads chat files and cleans messages for content analysis.
+    The result is shared between sessions, so it must not be modified in place.
+    """
+    chat_df = preprocessor.load_and_preprocess_data(zip_file_paths)
+    # Preprocess messages before filtering to ensure all words are cleaned
+    if not chat_df.empty:
+        chat_df = utility.preprocess_messages(chat_df)
+    return chat_df
+
+def lease_chat(store, chat_key, zip_file_paths):
+    """
+    Returns the parsed chat for `chat_key`, holding a reference to it in the
+    shared store for as long as this session keeps using it.
+    """
+    lease = st.session_state.get('chat_lease')
+    if lease is None or lease.key != chat_key:
+        if lease is not None:
+            lease.release()
+        lease = store.lease(chat_key, lambda: load_and_clean_chat(zip_file_paths), heavy=True)
+        st.session_state['chat_lease'] = lease
+    return lease.value
 
 # Set up the basic Streamlit page configuration
 st.set_page_config(page_title="WhatsApp Chat Analysis", layout="wide")
 
+# Parsed chats and analysis results are shared across sessions by content hash
+store = get_shared_store()
+
 # Add a main title to the application
 st.title("WhatsApp Chat Analysis Dashboard")
 
@@ -66,21 +105,18 @@ if uploaded_files:
             zip_file_paths.append(file_path)
 
         st.sidebar.success(f"Successfully uploaded {len(zip_file_paths)} files.")
+        chat_key = ('chat', shared_store.content_hash([uploaded_file.getbuffer() for uploaded_file in uploaded_files]))
 
-        # 1. Load and preprocess data
+        # 1. Load and preprocess data (reused if another session uploaded the same files)
         st.subheader("Data Loading and Preprocessing")
         with st.spinner('Loading and preprocessing chat data...'):
-            chat_df = preprocessor.load_and_preprocess_data(zip_file_paths)
+            chat_df = lease_chat(store, chat_key, zip_file_paths)
 
         if chat_df.empty:
             st.error("No valid chat data could be extracted from the uploaded files. Please ensure they are valid WhatsApp chat zip archives.")
         else:
             st.success(f"Successfully loaded {len(chat_df)} messages.\n")
 
-            # 2. Preprocess messages for content analysis (before filtering to ensure all words are cleaned)
-            with st.spinner('Cleaning messages for content analysis...'):
-                chat_df = utility.preprocess_messages(chat_df)
-
             # --- Interactive Filters in Sidebar ---
             st.sidebar.header("Filter Data")
 
@@ -99,11 +135,22 @@ if uploaded_files:
             start_datetime = datetime.datetime.combine(start_date, datetime.time.min)
             end_datetime = datetime.datetime.combine(end_date, datetime.time.max)
 
-            # Apply filters to create filtered_df
-            filtered_df = chat_df[
-                (chat_df['Timestamp'] >= start_datetime) &
-                (chat_df['Timestamp'] <= end_datetime)
-            ].copy() # Use .copy() to avoid SettingWithCopyWarning
+            # Session gap used to split conversations for response-time analytics
+            session_gap_minutes = st.sidebar.slider("Session Inactivity Gap (minutes)", min_value=5, max_value=720, value=60, step=5)
+
+            # Approximate mode swaps exact counters for bounded-memory sketches on very large chats
+            approximate_mode = st.sidebar.checkbox("Approximate Mode (large chats)", value=False,
+                                                   help="Uses Count-Min, HyperLogLog and reservoir sampling to keep memory bounded. Counts may be slightly overestimated and sample messages are random.")
+
+            # Apply filters to create filtered_df. The shared chat_df is used as-is
+            # when the full date range is selected, so sessions don't copy it.
+            if start_date > min_date.date() or end_date < max_date.date() or chat_df['Timestamp'].isna().any():
+                filtered_df = chat_df[
+                    (chat_df['Timestamp'] >= start_datetime) &
+                    (chat_df['Timestamp'] <= end_datetime)
+                ]
+            else:
+                filtered_df = chat_df
 
             if 'All' not in selected_senders:
                 filtered_df = filtered_df[filtered_df['Sender'].isin(selected_senders)]
@@ -113,13 +160,23 @@ if uploaded_files:
             else:
                 st.success(f"Displaying {len(filtered_df)} messages after filtering.")
 
+                # Results are shared across sessions analysing the same chat with the same filters
+                analysis_key = (chat_key, tuple(sorted(selected_senders)), start_date, end_date, approximate_mode)
+
                 # 3. Calculate metrics using filtered_df
                 with st.spinner('Calculating chat metrics...'):
-                    metrics = utility.calculate_metrics(filtered_df)
+                    metrics = store.get_or_compute(
+                        ('metrics', analysis_key, session_gap_minutes),
+                        lambda: utility.calculate_metrics(filtered_df, session_gap_minutes=session_gap_minutes, approximate=approximate_mode)
+                    )
 
-                # 4. Perform content analysis using filtered_df
+                # 4. Perform content analysis using filtered_df (queued on the shared worker pool)
                 with st.spinner('Performing content analysis...'):
-                    content_analysis_results = utility.perform_content_analysis(filtered_df)
+                    content_analysis_results = store.get_or_compute(
+                        ('content', analysis_key),
+                        lambda: utility.perform_content_analysis(filtered_df, approximate=approximate_mode),
+                        heavy=True
+                    )
 
                 st.header("Dashboard Overview")
                 st.subheader("Key Metrics")
@@ -183,6 +240,52 @@ if uploaded_files:
                 else:
                     st.info("Not enough data to show hourly activity for top senders with current filters.")
 
+                st.header("Conversation Dynamics")
+
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric(label="Conversation Sessions", value=metrics['total_sessions'])
+                with col2:
+                    median_response = metrics['median_response_time']
+                    st.metric(label="Median Response Time", value="N/A" if pd.isna(median_response) else f"{median_response:.1f} min")
+                with col3:
+                    st.metric(label="Longest Daily Streak", value=f"{metrics['longest_daily_streak']} days")
+
+                # Chart 5: Conversation Starters
+                st.subheader("Who Starts Conversations")
+                if not metrics['conversation_starters'].empty:
+                    starters_df = metrics['conversation_starters'].head(10).reset_index()
+                    starters_df.columns = ['Sender', 'Sessions Started']
+                    fig_starters = px.bar(starters_df, x='Sender', y='Sessions Started',
+                                          title='Conversations Started per Participant',
+                                          color_discrete_sequence=px.colors.sequential.Viridis)
+                    st.plotly_chart(fig_starters, use_container_width=True)
+                else:
+                    st.info("Not enough data to identify conversation starters with current filters.")
+
+                # Chart 6: Median Response Time per Sender
+                st.subheader("Median Response Time per Participant")
+                if not metrics['median_response_time_per_sender'].empty:
+                    response_df = metrics['median_response_time_per_sender'].head(10).reset_index()
+                    response_df.columns = ['Sender', 'Median Response (min)']
+                    fig_response = px.bar(response_df, x='Sender', y='Median Response (min)',
+                                          title='Median Response Time per Participant (Fastest 10)',
+                                          color_discrete_sequence=px.colors.sequential.Viridis)
+                    st.plotly_chart(fig_response, use_container_width=True)
+                    st.dataframe(metrics['response_time_per_pair'].head(20), use_container_width=True)
+                else:
+                    st.info("Not enough replies between participants to calculate response times.")
+
+                # Chart 7: Session Size Distribution
+                st.subheader("Messages per Conversation Session")
+                fig_sessions = px.histogram(metrics['sessions'], x='Messages', nbins=50,
+                                            title='Distribution of Messages per Session',
+                                            color_discrete_sequence=px.colors.sequential.Viridis)
+                st.plotly_chart(fig_sessions, use_container_width=True)
+
+                st.subheader("Longest Message Streaks")
+                st.dataframe(metrics['longest_message_streaks'].head(10).rename('Consecutive Messages'), use_container_width=True)
+
                 st.header("Message Content Analysis")
 
                 st.subheader("Top 20 Most Frequent Words")
@@ -226,27 +329,25 @@ if uploaded_files:
                     st.dataframe(content_analysis_results['sample_neutral_messages'], use_container_width=True)
 
                 with st.expander("View Raw Chat Data"):
-                    st.dataframe(filtered_df, use_container_width=True)
+                    st.dataframe(filtered_df.join(content_analysis_results['message_sentiment']), use_container_width=True)
 
 else:
     # Use sample data if no files are uploaded
     if os.path.exists(sample_zip_filename):
         st.info(f"No files uploaded. Using sample data from '{sample_zip_filename}'.")
         zip_file_paths = [sample_zip_filename]
+        with open(sample_zip_filename, "rb") as f:
+            chat_key = ('chat', shared_store.content_hash([f.read()]))
 
         st.subheader("Data Loading and Preprocessing")
         with st.spinner('Loading and preprocessing sample chat data...'):
-            chat_df = preprocessor.load_and_preprocess_data(zip_file_paths)
+            chat_df = lease_chat(store, chat_key, zip_file_paths)
 
         if chat_df.empty:
             st.error("No valid chat data could be extracted from the sample file.")
         else:
             st.success(f"Successfully loaded {len(chat_df)} messages from sample data.\n")
 
-            # 2. Preprocess messages for content analysis (before filtering to ensure all words are cleaned)
-            with st.spinner('Cleaning messages for content analysis...'):
-                chat_df = utility.preprocess_messages(chat_df)
-
             # --- Interactive Filters in Sidebar ---
             st.sidebar.header("Filter Data")
 
@@ -265,11 +366,22 @@ else:
             start_datetime = datetime.datetime.combine(start_date, datetime.time.min)
             end_datetime = datetime.datetime.combine(end_date, datetime.time.max)
 
-            # Apply filters to create filtered_df
-            filtered_df = chat_df[
-                (chat_df['Timestamp'] >= start_datetime) &
-                (chat_df['Timestamp'] <= end_datetime)
-            ].copy() # Use .copy() to avoid SettingWithCopyWarning
+            # Session gap used to split conversations for response-time analytics
+            session_gap_minutes = st.sidebar.slider("Session Inactivity Gap (minutes)", min_value=5, max_value=720, value=60, step=5)
+
+            # Approximate mode swaps exact counters for bounded-memory sketches on very large chats
+            approximate_mode = st.sidebar.checkbox("Approximate Mode (large chats)", value=False,
+                                                   help="Uses Count-Min, HyperLogLog and reservoir sampling to keep memory bounded. Counts may be slightly overestimated and sample messages are random.")
+
+            # Apply filters to create filtered_df. The shared chat_df is used as-is
+            # when the full date range is selected, so sessions don't copy it.
+            if start_date > min_date.date() or end_date < max_date.date() or chat_df['Timestamp'].isna().any():
+                filtered_df = chat_df[
+                    (chat_df['Timestamp'] >= start_datetime) &
+                    (chat_df['Timestamp'] <= end_datetime)
+                ]
+            else:
+                filtered_df = chat_df
 
             if 'All' not in selected_senders:
                 filtered_df = filtered_df[filtered_df['Sender'].isin(selected_senders)]
@@ -279,13 +391,23 @@ else:
             else:
                 st.success(f"Displaying {len(filtered_df)} messages after filtering.")
 
+                # Results are shared across sessions analysing the same chat with the same filters
+                analysis_key = (chat_key, tuple(sorted(selected_senders)), start_date, end_date, approximate_mode)
+
                 # 3. Calculate metrics using filtered_df
                 with st.spinner('Calculating chat metrics...'):
-                    metrics = utility.calculate_metrics(filtered_df)
+                    metrics = store.get_or_compute(
+                        ('metrics', analysis_key, session_gap_minutes),
+                        lambda: utility.calculate_metrics(filtered_df, session_gap_minutes=session_gap_minutes, approximate=approximate_mode)
+                    )
 
-                # 4. Perform content analysis using filtered_df
+                # 4. Perform content analysis using filtered_df (queued on the shared worker pool)
                 with st.spinner('Performing content analysis...'):
-                    content_analysis_results = utility.perform_content_analysis(filtered_df)
+                    content_analysis_results = store.get_or_compute(
+                        ('content', analysis_key),
+                        lambda: utility.perform_content_analysis(filtered_df, approximate=approximate_mode),
+                        heavy=True
+                    )
 
                 st.header("Dashboard Overview")
                 st.subheader("Key Metrics")
@@ -349,6 +471,52 @@ else:
                 else:
                     st.info("Not enough data to show hourly activity for top senders with current filters.")
 
+                st.header("Conversation Dynamics")
+
+                col1, col2, col3 = st.columns(3)
+                with col1:
+                    st.metric(label="Conversation Sessions", value=metrics['total_sessions'])
+                with col2:
+                    median_response = metrics['median_response_time']
+                    st.metric(label="Median Response Time", value="N/A" if pd.isna(median_response) else f"{median_response:.1f} min")
+                with col3:
+                    st.metric(label="Longest Daily Streak", value=f"{metrics['longest_daily_streak']} days")
+
+                # Chart 5: Conversation Starters
+                st.subheader("Who Starts Conversations")
+                if not metrics['conversation_starters'].empty:
+                    starters_df = metrics['conversation_starters'].head(10).reset_index()
+                    starters_df.columns = ['Sender', 'Sessions Started']
+                    fig_starters = px.bar(starters_df, x='Sender', y='Sessions Started',
+                                          title='Conversations Started per Participant',
+                                          color_discrete_sequence=px.colors.sequential.Viridis)
+                    st.plotly_chart(fig_starters, use_container_width=True)
+                else:
+                    st.info("Not enough data to identify conversation starters with current filters.")
+
+                # Chart 6: Median Response Time per Sender
+                st.subheader("Median Response Time per Participant")
+                if not metrics['median_response_time_per_sender'].empty:
+                    response_df = metrics['median_response_time_per_sender'].head(10).reset_index()
+                    response_df.columns = ['Sender', 'Median Response (min)']
+                    fig_response = px.bar(response_df, x='Sender', y='Median Response (min)',
+                                          title='Median Response Time per Participant (Fastest 10)',
+                                          color_discrete_sequence=px.colors.sequential.Viridis)
+                    st.plotly_chart(fig_response, use_container_width=True)
+                    st.dataframe(metrics['response_time_per_pair'].head(20), use_container_width=True)
+                else:
+                    st.info("Not enough replies between participants to calculate response times.")
+
+                # Chart 7: Session Size Distribution
+                st.subheader("Messages per Conversation Session")
+                fig_sessions = px.histogram(metrics['sessions'], x='Messages', nbins=50,
+                                            title='Distribution of Messages per Session',
+                                            color_discrete_sequence=px.colors.sequential.Viridis)
+                st.plotly_chart(fig_sessions, use_container_width=True)
+
+                st.subheader("Longest Message Streaks")
+                st.dataframe(metrics['longest_message_streaks'].head(10).rename('Consecutive Messages'), use_container_width=True)
+
                 st.header("Message Content Analysis")
 
                 st.subheader("Top 20 Most Frequent Words")
@@ -392,7 +560,16 @@ else:
                     st.dataframe(content_analysis_results['sample_neutral_messages'], use_container_width=True)
 
                 with st.expander("View Raw Chat Data"):
-                    st.dataframe(filtered_df, use_container_width=True)
+                    st.dataframe(filtered_df.join(content_analysis_results['message_sentiment']), use_container_width=True)
 
     else:
-        st.warning("No sample_chat.zip found. Please upload your chat files or ensure 'sample_chat.zip' is in the correct directory.")
\ No newline at end of file
+        st.warning("No sample_chat.zip found. Please upload your chat files or ensure 'sample_chat.zip' is in the correct directory.")
+
+# Shared cache usage across all sessions in this process
+store_stats = store.stats()
+st.sidebar.caption(
+    f"Shared cache: {store_stats['entries']} entries, "
+    f"{store_stats['total_size'] / 1024 ** 2:.0f} / {store_stats['memory_budget'] / 1024 ** 2:.0f} MB "
+    f"({store_stats['pinned_size'] / 1024 ** 2:.0f} MB in use by open sessions), "
+    f"{store_stats['hits']} hits / {store_stats['misses']} misses"
+)
@@ -0,0 +1,255 @@
+import hashlib
+import logging
+import sys
+import threading
+import weakref
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(file_contents):
+    """
+    Returns a SHA-256 key for a set of uploaded files.
+
+    Args:
+        file_contents (list): The raw bytes (or buffers) of each file.
+
+    Returns:
+        str: A hex digest that does not depend on the upload order.
+    """
+    file_digests = sorted(hashlib.sha256(content).hexdigest() for content in file_contents)
+    return hashlib.sha256('\n'.join(file_digests).encode('utf-8')).hexdigest()
+
+
+def estimate_size(value):
+    """
+    Estimates the in-memory size of a cached value in bytes.
+    """
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(deep=True))
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value.values())
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    if hasattr(value, 'getbands'):
+        # PIL images (e.g. the word cloud)
+        return value.width * value.height * len(value.getbands())
+    return sys.getsizeof(value)
+
+
+class _Entry:
+    def __init__(self, value, size):
+        self.value = value
+        self.size = size
+        self.refcount = 0
+
+
+class Lease:
+    """
+    Keeps a shared entry pinned in the store until released.
+
+    The reference is also released automatically when the lease is garbage
+    collected, e.g. when the Streamlit session holding it ends. The garbage
+    collector can run while the store's lock is held on the same thread, so
+    the finalizer only queues the key; the store applies queued releases the
+    next time it takes its lock.
+    """
+
+    def __init__(self, store, key, value):
+        self.key = key
+        self.value = value
+        self._store = store
+        self._finalizer = weakref.finalize(self, store._pending_releases.append, key)
+
+    def release(self):
+        """
+        Releases the reference; calling it more than once has no effect.
+        """
+        if self._finalizer.alive:
+            self._finalizer()
+            self._store.apply_pending_releases()
+
+
+class SharedStore:
+    """
+    Process-wide cache of parsed chats and analysis results shared by all
+    Streamlit sessions.
+
+    Entries are keyed by content hash, so identical uploads are parsed and
+    analysed once. Entries referenced through a Lease are pinned and never
+    evicted, but still count towards `memory_budget_bytes`; unpinned entries
+    are evicted least-recently-used first whenever the total estimated size
+    exceeds the budget, and a warning is logged when pinned entries alone
+    exceed it. Heavy computations run on a pool of `max_workers` threads so
+    concurrent analyses queue instead of oversubscribing the CPUs.
+    """
+
+    def __init__(self, memory_budget_bytes, max_workers):
+        self.memory_budget_bytes = memory_budget_bytes
+        self.max_workers = max_workers
+        self.total_size = 0
+        self.pinned_size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        # Keys released by Lease finalizers; deque.append needs no lock
+        self._pending_releases = deque()
+        # key -> [lock, number of callers using it] for in-flight computations
+        self._key_locks = {}
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='chat-analysis')
+
+    def get_or_compute(self, key, compute, heavy=False, acquire=False):
+        """
+        Returns the cached value for `key`, computing and storing it if missing.
+
+        Concurrent requests for the same missing key wait for a single
+        computation. With `heavy=True`, `compute` runs on the bounded worker
+        pool; with `acquire=True`, the entry's reference count is incremented
+        and must later be released.
+        """
+        value, found = self._lookup(key, acquire)
+        if found:
+            return value
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            key_lock[1] += 1
+        try:
+            with key_lock[0]:
+                # Another session may have finished computing while we waited
+                value, found = self._lookup(key, acquire)
+                if found:
+                    return value
+                with self._lock:
+                    self.misses += 1
+                value = self._executor.submit(compute).result() if heavy else compute()
+                self._insert(key, value, acquire)
+                return value
+        finally:
+            # Only the last caller using the lock removes it
+            with self._lock:
+                key_lock[1] -= 1
+                if key_lock[1] == 0:
+                    del self._key_locks[key]
+
+    def lease(self, key, compute, heavy=False):
+        """
+        Returns a Lease on the value for `key`, computing it if missing.
+        """
+        value = self.get_or_compute(key, compute, heavy=heavy, acquire=True)
+        return Lease(self, key, value)
+
+    def release(self, key):
+        """
+        Decrements the reference count of `key` and evicts entries if over budget.
+        """
+        self._pending_releases.append(key)
+        self.apply_pending_releases()
+
+    def apply_pending_releases(self):
+        """
+        Applies releases queued by explicit calls or Lease finalizers.
+        """
+        with self._lock:
+            self._drain_releases()
+
+    def stats(self):
+        """
+        Returns a snapshot of the store's size, budget and hit/miss counts.
+        """
+        with self._lock:
+            self._drain_releases()
+            return {
+                'entries': len(self._entries),
+                'pinned_entries': sum(1 for entry in self._entries.values() if entry.refcount > 0),
+                'total_size': self.total_size,
+                'pinned_size': self.pinned_size,
+                'memory_budget': self.memory_budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
+
+    def _lookup(self, key, acquire):
+        with self._lock:
+            self._drain_releases()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, False
+            self._entries.move_to_end(key)
+            if acquire:
+                if entry.refcount == 0:
+                    self.pinned_size += entry.size
+                    self._warn_if_pinned_over_budget()
+                entry.refcount += 1
+            self.hits += 1
+            return entry.value, True
+
+    def _insert(self, key, value, acquire):
+        entry = _Entry(value, estimate_size(value))
+        with self._lock:
+            self._drain_releases()
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.total_size -= previous.size
+                if previous.refcount > 0:
+                    self.pinned_size -= previous.size
+                entry.refcount = previous.refcount
+            if acquire:
+                entry.refcount += 1
+            self._entries[key] = entry
+            self.total_size += entry.size
+            if entry.refcount > 0:
+                self.pinned_size += entry.size
+                self._warn_if_pinned_over_budget()
+            self._evict()
+            if key not in self._entries:
+                logger.warning(
+                    "Shared cache entry %r (%.0f MB) did not fit in the %.0f MB budget (%.0f MB pinned by open sessions) "
+                    "and was evicted immediately; raise CHAT_CACHE_MEMORY_MB to share it across sessions.",
+                    key[0] if isinstance(key, tuple) else key,
+                    entry.size / 1024 ** 2, self.memory_budget_bytes / 1024 ** 2, self.pinned_size / 1024 ** 2
+                )
+
+    def _drain_releases(self):
+        # Caller must hold self._lock
+        released = False
+        while True:
+            try:
+                key = self._pending_releases.popleft()
+            except IndexError:
+                break
+            entry = self._entries.get(key)
+            if entry is not None and entry.refcount > 0:
+                entry.refcount -= 1
+                if entry.refcount == 0:
+                    self.pinned_size -= entry.size
+                released = True
+        if released:
+            self._evict()
+
+    def _warn_if_pinned_over_budget(self):
+        # Caller must hold self._lock
+        if self.pinned_size > self.memory_budget_bytes:
+            logger.warning(
+                "Chats pinned by open sessions use %.0f MB, over the %.0f MB shared cache budget; "
+                "raise CHAT_CACHE_MEMORY_MB or reduce concurrent uploads.",
+                self.pinned_size / 1024 ** 2, self.memory_budget_bytes / 1024 ** 2
+            )
+
+    def _evict(self):
+        # Caller must hold self._lock. Pinned entries count towards the budget but are never evicted.
+        if self.total_size <= self.memory_budget_bytes:
+            return
+        for key in list(self._entries):
+            entry = self._entries[key]
+            if entry.refcount == 0:
+                del self._entries[key]
+                self.total_size -= entry.size
+                if self.total_size <= self.memory_budget_bytes:
+                    return
@@ -0,0 +1,234 @@
+import hashlib
+import heapq
+import math
+import random
+from collections import Counter
+from itertools import islice
+import numpy as np
+
+# Number of items hashed and applied to a sketch in one vectorized batch
+CHUNK_SIZE = 10000
+
+
+def _hash64(item, seed=0):
+    """
+    Returns a stable 64-bit hash of an item.
+
+    Python's built-in hash() is randomized per process, so a keyed blake2b
+    digest is used instead to keep sketches mergeable across workers.
+    """
+    key = seed.to_bytes(8, 'little')
+    digest = hashlib.blake2b(str(item).encode('utf-8'), digest_size=8, key=key).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def _chunks(items, size=CHUNK_SIZE):
+    """
+    Yields successive lists of at most `size` items from an iterable.
+    """
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch with a bounded set of top-K heavy-hitter candidates.
+
+    Memory is fixed at depth x width counters plus `top_k` candidates,
+    regardless of the number of distinct items. Estimates never undercount;
+    with probability at least 1 - delta each estimate exceeds the true count
+    by no more than epsilon * N, where N is the total number of updates.
+    """
+
+    def __init__(self, epsilon=0.001, delta=0.01, top_k=100, seed=0):
+        self.epsilon = epsilon
+        self.delta = delta
+        self.width = int(math.ceil(math.e / epsilon))
+        self.depth = int(math.ceil(math.log(1 / delta)))
+        self.top_k = top_k
+        self.seed = seed
+        self.table = np.zeros((self.depth, self.width), dtype=np.int64)
+        self.total = 0
+        self.candidates = {}
+        self._min_candidate = 0
+
+    def _indexes(self, items):
+        # Double hashing: row i uses h1 + i * h2 (Kirsch-Mitzenmacher)
+        hashes = np.fromiter((_hash64(item, self.seed) for item in items), dtype=np.uint64, count=len(items))
+        h1 = hashes & np.uint64(0xFFFFFFFF)
+        h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+        rows = np.arange(self.depth, dtype=np.uint64)[:, None]
+        return ((h1[None, :] + rows * h2[None, :]) % np.uint64(self.width)).astype(np.int64)
+
+    def update_many(self, items):
+        """
+        Adds every item of an iterable to the sketch, one chunk at a time.
+        """
+        rows = np.arange(self.depth)[:, None]
+        for chunk in _chunks(items):
+            chunk_counts = Counter(chunk)
+            unique_items = list(chunk_counts)
+            counts = np.fromiter(chunk_counts.values(), dtype=np.int64, count=len(unique_items))
+            indexes = self._indexes(unique_items)
+            np.add.at(self.table, (rows, indexes), counts[None, :])
+            self.total += int(counts.sum())
+            estimates = self.table[rows, indexes].min(axis=0)
+            for item, estimate in zip(unique_items, estimates.tolist()):
+                self._offer(item, estimate)
+
+    def _offer(self, item, estimate):
+        if item in self.candidates or len(self.candidates) < self.top_k:
+            self.candidates[item] = estimate
+            return
+        # Candidates only ever grow, so the cached minimum is a lower bound
+        if estimate <= self._min_candidate:
+            return
+        min_item = min(self.candidates, key=self.candidates.get)
+        if estimate > self.candidates[min_item]:
+            del self.candidates[min_item]
+            self.candidates[item] = estimate
+            min_item = min(self.candidates, key=self.candidates.get)
+        self._min_candidate = self.candidates[min_item]
+
+    def estimate(self, item):
+        """
+        Returns the estimated count of a single item.
+        """
+        indexes = self._indexes([item])
+        return int(self.table[np.arange(self.depth), indexes[:, 0]].min())
+
+    def most_common(self, n=None):
+        """
+        Returns the `n` heaviest candidates as (item, estimate) pairs, like Counter.most_common.
+        """
+        n = len(self.candidates) if n is None else n
+        return heapq.nlargest(n, self.candidates.items(), key=lambda pair: pair[1])
+
+    def merge(self, other):
+        """
+        Merges another sketch built with the same parameters into this one.
+        """
+        if (self.width, self.depth, self.seed) != (other.width, other.depth, other.seed):
+            raise ValueError("Only Count-Min sketches with the same width, depth and seed can be merged.")
+        self.table += other.table
+        self.total += other.total
+        merged_items = list(set(self.candidates) | set(other.candidates))
+        self.candidates = {}
+        self._min_candidate = 0
+        if merged_items:
+            estimates = self.table[np.arange(self.depth)[:, None], self._indexes(merged_items)].min(axis=0)
+            for item, estimate in zip(merged_items, estimates.tolist()):
+                self._offer(item, estimate)
+        return self
+
+
+class HyperLogLog:
+    """
+    HyperLogLog distinct-count estimator.
+
+    Uses 2 ** precision one-byte registers (4 KB at the default precision of
+    12) and has a relative standard error of about 1.04 / sqrt(2 ** precision),
+    i.e. roughly 1.6% by default.
+    """
+
+    def __init__(self, precision=12, seed=0):
+        if not 4 <= precision <= 16:
+            raise ValueError("HyperLogLog precision must be between 4 and 16.")
+        self.precision = precision
+        self.num_registers = 1 << precision
+        self.seed = seed
+        self.registers = np.zeros(self.num_registers, dtype=np.uint8)
+
+    def update_many(self, items):
+        """
+        Adds every item of an iterable to the sketch, one chunk at a time.
+        """
+        remaining_bits = 64 - self.precision
+        mask = (1 << remaining_bits) - 1
+        for chunk in _chunks(items):
+            hashes = [_hash64(item, self.seed) for item in chunk]
+            indexes = np.fromiter((h >> remaining_bits for h in hashes), dtype=np.int64, count=len(hashes))
+            # Rank is the position of the leftmost 1-bit in the remaining bits
+            ranks = np.fromiter((remaining_bits - (h & mask).bit_length() + 1 for h in hashes), dtype=np.uint8, count=len(hashes))
+            np.maximum.at(self.registers, indexes, ranks)
+
+    def estimate(self):
+        """
+        Returns the estimated number of distinct items.
+        """
+        m = self.num_registers
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw_estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zero_registers = int(np.count_nonzero(self.registers == 0))
+        # Small-range correction (linear counting)
+        if raw_estimate <= 2.5 * m and zero_registers:
+            return int(round(m * math.log(m / zero_registers)))
+        return int(round(raw_estimate))
+
+    def merge(self, other):
+        """
+        Merges another sketch built with the same precision and seed into this one.
+        """
+        if (self.precision, self.seed) != (other.precision, other.seed):
+            raise ValueError("Only HyperLogLog sketches with the same precision and seed can be merged.")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+
+class ReservoirSample:
+    """
+    Uniform random sample of at most `size` items from a stream (Algorithm R).
+
+    Every item seen has the same probability, size / seen, of being in the
+    sample, and memory is bounded by `size` regardless of stream length.
+    """
+
+    def __init__(self, size, seed=0):
+        self.size = size
+        self.seen = 0
+        self.items = []
+        self._random = random.Random(seed)
+
+    def update(self, item):
+        """
+        Offers a single item to the reservoir.
+        """
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+        else:
+            slot = self._random.randrange(self.seen)
+            if slot < self.size:
+                self.items[slot] = item
+
+    def update_many(self, items):
+        """
+        Offers every item of an iterable to the reservoir.
+        """
+        for item in items:
+            self.update(item)
+
+    def merge(self, other):
+        """
+        Merges another reservoir of the same size so the result is a uniform
+        sample of both streams combined.
+        """
+        if self.size != other.size:
+            raise ValueError("Only reservoirs of the same size can be merged.")
+        # Draw how many items come from each side (hypergeometric split)
+        remaining_self, remaining_other = self.seen, other.seen
+        from_self = 0
+        for _ in range(min(self.size, self.seen + other.seen)):
+            if self._random.randrange(remaining_self + remaining_other) < remaining_self:
+                from_self += 1
+                remaining_self -= 1
+            else:
+                remaining_other -= 1
+        from_other = min(self.size, self.seen + other.seen) - from_self
+        self.items = self._random.sample(self.items, from_self) + self._random.sample(other.items, from_other)
+        self.seen += other.seen
+        return self
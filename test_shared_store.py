@@ -0,0 +1,152 @@
+import gc
+import threading
+import time
+import pandas as pd
+import shared_store
+
+
+def _frame(rows):
+    return pd.DataFrame({'a': range(rows)})
+
+
+def test_concurrent_requests_compute_once():
+    store = shared_store.SharedStore(10 ** 6, max_workers=2)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        time.sleep(0.1)
+        return _frame(10)
+
+    threads = [threading.Thread(target=store.get_or_compute, args=('key', compute), kwargs={'heavy': True}) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(calls) == 1
+    assert store.stats()['misses'] == 1
+    assert store._key_locks == {}
+
+
+def test_failed_computation_is_not_run_concurrently():
+    store = shared_store.SharedStore(10 ** 6, max_workers=4)
+    running = []
+    max_running = []
+    attempts = []
+    lock = threading.Lock()
+
+    def compute():
+        with lock:
+            attempts.append(1)
+            running.append(1)
+            max_running.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.pop()
+        if len(attempts) == 1:
+            raise RuntimeError("first attempt fails")
+        return _frame(10)
+
+    def worker():
+        try:
+            store.get_or_compute('key', compute)
+        except RuntimeError:
+            pass
+
+    # Stagger callers so new ones arrive while a waiter is retrying
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join()
+
+    assert max(max_running) == 1
+    assert len(attempts) == 2
+    assert store._key_locks == {}
+
+
+def test_lease_pins_entry_until_released():
+    store = shared_store.SharedStore(1, max_workers=1)
+    lease = store.lease('chat', lambda: _frame(1000))
+    assert store.stats()['entries'] == 1
+    assert store.stats()['pinned_size'] == store.stats()['total_size']
+
+    lease.release()
+    lease.release()
+    assert store.stats()['entries'] == 0
+    assert store.stats()['pinned_size'] == 0
+
+
+def test_lease_released_on_garbage_collection():
+    store = shared_store.SharedStore(1, max_workers=1)
+    lease = store.lease('chat', lambda: _frame(1000))
+    del lease
+    gc.collect()
+    assert store.stats()['entries'] == 0
+
+
+def test_lease_collected_while_lock_is_held():
+    store = shared_store.SharedStore(1, max_workers=1)
+
+    # Leases held by sessions are usually freed by the cyclic collector
+    cycle = {'lease': store.lease('chat', lambda: _frame(1000))}
+    cycle['self'] = cycle
+    del cycle
+
+    def collect_under_lock():
+        with store._lock:
+            gc.collect()
+
+    thread = threading.Thread(target=collect_under_lock, daemon=True)
+    thread.start()
+    thread.join(timeout=5)
+
+    assert not thread.is_alive()
+    assert store.stats()['entries'] == 0
+
+
+def test_eviction_is_least_recently_used_and_skips_pinned_entries():
+    entry_size = shared_store.estimate_size(_frame(100))
+    chat_size = shared_store.estimate_size(_frame(200))
+    store = shared_store.SharedStore(chat_size + 2 * entry_size, max_workers=1)
+    lease = store.lease('chat', lambda: _frame(200))
+
+    store.get_or_compute('first', lambda: _frame(100))
+    store.get_or_compute('second', lambda: _frame(100))
+    store.get_or_compute('first', lambda: _frame(100))
+    store.get_or_compute('third', lambda: _frame(100))
+
+    assert set(store._entries) == {'chat', 'first', 'third'}
+    assert store.stats()['total_size'] <= store.memory_budget_bytes
+    lease.release()
+
+
+def test_pinned_entries_count_towards_budget(caplog):
+    entry_size = shared_store.estimate_size(_frame(100))
+    store = shared_store.SharedStore(2 * entry_size, max_workers=1)
+    store.get_or_compute('result', lambda: _frame(100))
+
+    with caplog.at_level('WARNING', logger='shared_store'):
+        lease = store.lease('chat', lambda: _frame(1000))
+
+    # The pinned chat stays, the unpinned result is evicted to make room
+    assert set(store._entries) == {'chat'}
+    assert 'over the' in caplog.text
+    lease.release()
+    assert store.stats()['entries'] == 0
+
+
+def test_oversized_entry_logs_warning(caplog):
+    store = shared_store.SharedStore(1, max_workers=1)
+    with caplog.at_level('WARNING', logger='shared_store'):
+        value = store.get_or_compute(('content', 'hash'), lambda: _frame(1000))
+    assert len(value) == 1000
+    assert store.stats()['entries'] == 0
+    assert 'evicted immediately' in caplog.text
+
+
+def test_content_hash_ignores_upload_order():
+    assert shared_store.content_hash([b'a', b'b']) == shared_store.content_hash([b'b', b'a'])
+    assert shared_store.content_hash([b'a']) != shared_store.content_hash([b'b'])
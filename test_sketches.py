@@ -0,0 +1,118 @@
+import math
+from collections import Counter
+import numpy as np
+import pytest
+import sketches
+
+
+def _zipf_words(size, seed=0):
+    rng = np.random.default_rng(seed)
+    return [f"w{rank}" for rank in rng.zipf(1.3, size)]
+
+
+def test_count_min_never_undercounts_and_stays_within_bound():
+    words = _zipf_words(50000)
+    exact = Counter(words)
+    sketch = sketches.CountMinSketch(epsilon=0.001, delta=0.01, top_k=50)
+    sketch.update_many(words)
+
+    bound = sketch.epsilon * sketch.total
+    errors = [sketch.estimate(word) - count for word, count in exact.items()]
+    assert sketch.total == len(words)
+    assert min(errors) >= 0
+    # Each estimate is within the bound with probability 1 - delta
+    assert sum(error > bound for error in errors) <= math.ceil(sketch.delta * len(errors))
+
+
+def test_count_min_top_k_matches_exact_heavy_hitters():
+    words = _zipf_words(50000)
+    sketch = sketches.CountMinSketch(top_k=50)
+    sketch.update_many(words)
+
+    assert [word for word, _ in sketch.most_common(10)] == [word for word, _ in Counter(words).most_common(10)]
+
+
+def test_count_min_merge_equals_single_pass():
+    words = _zipf_words(30000)
+    single = sketches.CountMinSketch(top_k=50)
+    single.update_many(words)
+    left = sketches.CountMinSketch(top_k=50)
+    left.update_many(words[:12345])
+    right = sketches.CountMinSketch(top_k=50)
+    right.update_many(words[12345:])
+
+    left.merge(right)
+    assert np.array_equal(left.table, single.table)
+    assert left.total == single.total
+    assert left.most_common(10) == single.most_common(10)
+
+
+def test_count_min_merge_rejects_different_parameters():
+    with pytest.raises(ValueError):
+        sketches.CountMinSketch(epsilon=0.01).merge(sketches.CountMinSketch(epsilon=0.001))
+
+
+def test_hyperloglog_within_three_standard_errors():
+    for cardinality in (100, 5000, 100000):
+        sketch = sketches.HyperLogLog(precision=12)
+        sketch.update_many(f"item-{index}" for index in range(cardinality))
+        sketch.update_many(f"item-{index}" for index in range(cardinality // 2))
+
+        standard_error = 1.04 / math.sqrt(sketch.num_registers)
+        assert abs(sketch.estimate() - cardinality) <= 3 * standard_error * cardinality
+
+
+def test_hyperloglog_merge_equals_single_pass():
+    items = [f"item-{index}" for index in range(20000)]
+    single = sketches.HyperLogLog()
+    single.update_many(items)
+    left = sketches.HyperLogLog()
+    left.update_many(items[:7000])
+    right = sketches.HyperLogLog()
+    right.update_many(items[5000:])
+
+    left.merge(right)
+    assert np.array_equal(left.registers, single.registers)
+    assert left.estimate() == single.estimate()
+
+
+def test_reservoir_keeps_at_most_size_items():
+    sample = sketches.ReservoirSample(5)
+    sample.update_many(range(3))
+    assert sorted(sample.items) == [0, 1, 2]
+
+    sample.update_many(range(3, 1000))
+    assert len(sample.items) == 5
+    assert sample.seen == 1000
+    assert len(set(sample.items)) == 5
+
+
+def test_reservoir_merge_draws_from_both_sides():
+    from_left = 0
+    from_right = 0
+    for seed in range(200):
+        left = sketches.ReservoirSample(10, seed=seed)
+        left.update_many(('left', index) for index in range(1000))
+        right = sketches.ReservoirSample(10, seed=seed + 1000)
+        right.update_many(('right', index) for index in range(1000))
+
+        left.merge(right)
+        assert len(left.items) == 10
+        assert left.seen == 2000
+        assert len(set(left.items)) == 10
+        from_left += sum(1 for side, _ in left.items if side == 'left')
+        from_right += sum(1 for side, _ in left.items if side == 'right')
+
+    # Equal-sized streams contribute about half of the merged sample each
+    assert 0.4 < from_left / (from_left + from_right) < 0.6
+
+
+def test_reservoir_merge_with_small_streams_keeps_everything():
+    left = sketches.ReservoirSample(10)
+    left.update_many(range(3))
+    right = sketches.ReservoirSample(10)
+    right.update_many(range(3, 7))
+
+    left.merge(right)
+    assert sorted(left.items) == list(range(7))
+    assert left.seen == 7
@@ -0,0 +1,88 @@
+import pandas as pd
+import utility
+
+
+def _chat(rows):
+    timestamps, senders = zip(*rows)
+    return pd.DataFrame({
+        'Timestamp': pd.to_datetime(list(timestamps)),
+        'Sender': pd.Series(senders).astype('category'),
+        'Message': pd.Series(['message'] * len(rows)).astype('string'),
+    })
+
+
+def _sample_chat():
+    return _chat([
+        ('2024-01-01 10:00', 'A'),
+        ('2024-01-01 10:00', 'System'),
+        ('2024-01-01 10:02', 'B'),
+        ('2024-01-01 10:03', 'B'),
+        ('2024-01-01 10:10', 'A'),
+        # 110 minute gap: new session, and A's run does not continue across it
+        ('2024-01-01 12:00', 'A'),
+        ('2024-01-01 12:01', 'A'),
+        ('2024-01-01 12:30', 'C'),
+        ('2024-01-02 09:00', 'B'),
+        ('2024-01-03 09:00', 'A'),
+        (None, 'C'),
+    ])
+
+
+def test_sessions_are_split_on_inactivity_gap():
+    metrics = utility.calculate_conversation_metrics(_sample_chat(), session_gap_minutes=60)
+
+    assert metrics['total_sessions'] == 4
+    assert metrics['sessions']['Messages'].tolist() == [4, 3, 1, 1]
+    assert metrics['sessions']['Participants'].tolist() == [2, 2, 1, 1]
+    assert metrics['sessions']['Duration (min)'].tolist() == [10.0, 30.0, 0.0, 0.0]
+    assert metrics['average_messages_per_session'] == 2.25
+
+    # A wider gap merges the first two sessions
+    assert utility.calculate_conversation_metrics(_sample_chat(), session_gap_minutes=120)['total_sessions'] == 3
+
+
+def test_conversation_starters_exclude_system_and_non_starters():
+    metrics = utility.calculate_conversation_metrics(_sample_chat())
+
+    assert metrics['conversation_starters'].to_dict() == {'A': 3, 'B': 1}
+
+
+def test_replies_are_paired_within_sessions():
+    metrics = utility.calculate_conversation_metrics(_sample_chat())
+
+    pairs = {
+        (row['Responder'], row['Replying To']): (row['Median Response (min)'], row['Replies'])
+        for _, row in metrics['response_time_per_pair'].iterrows()
+    }
+    assert pairs == {('B', 'A'): (2.0, 1), ('A', 'B'): (7.0, 1), ('C', 'A'): (29.0, 1)}
+    assert metrics['median_response_time'] == 7.0
+    assert metrics['median_response_time_per_sender'].to_dict() == {'B': 2.0, 'A': 7.0, 'C': 29.0}
+
+
+def test_message_streaks_stop_at_session_boundaries():
+    metrics = utility.calculate_conversation_metrics(_sample_chat())
+
+    assert metrics['longest_message_streaks'].to_dict() == {'A': 2, 'B': 2, 'C': 1}
+    assert metrics['longest_daily_streak'] == 3
+
+
+def test_only_system_messages_give_empty_results():
+    chat_df = _chat([('2024-01-01 10:00', 'System'), ('2024-01-01 10:05', 'System')])
+    metrics = utility.calculate_conversation_metrics(chat_df)
+
+    assert metrics['total_sessions'] == 0
+    assert metrics['sessions'].empty
+    assert metrics['conversation_starters'].empty
+    assert metrics['response_time_per_pair'].empty
+    assert metrics['longest_message_streaks'].empty
+    assert pd.isna(metrics['median_response_time'])
+    assert metrics['longest_daily_streak'] == 0
+
+
+def test_filtered_out_messages_give_empty_results():
+    chat_df = _sample_chat()
+    metrics = utility.calculate_conversation_metrics(chat_df[chat_df['Sender'] == 'Nobody'])
+
+    assert metrics['total_sessions'] == 0
+    assert metrics['conversation_starters'].empty
+    assert metrics['longest_daily_streak'] == 0
@@ -6,27 +6,52 @@ from nltk.stem import WordNetLemmatizer
 from nltk.tokenize import word_tokenize
 from nltk.sentiment.vader import SentimentIntensityAnalyzer
 from collections import Counter
+from itertools import chain
 from nltk.util import ngrams
 #import matplotlib.pyplot as plt
 #import seaborn as sns
 from wordcloud import WordCloud
 from gensim import corpora
 from gensim.models import LdaModel
+import sketches
 
-def calculate_metrics(chat_df):
+def calculate_metrics(chat_df, session_gap_minutes=60, approximate=False):
     """
     Calculates key chat metrics from the preprocessed DataFrame.
+
+    With `approximate=True`, participant counts come from bounded-memory
+    sketches (HyperLogLog and Count-Min) instead of exact nunique/value_counts.
     """
     metrics = {}
 
     # 2.a. Total number of messages
     metrics['total_messages'] = len(chat_df)
 
-    # 2.b. Number of unique participants (excluding 'System')
-    metrics['unique_participants'] = chat_df[chat_df['Sender'] != 'System']['Sender'].nunique()
-
-    # 2.c. Messages sent per participant
-    metrics['messages_per_participant'] = chat_df['Sender'].value_counts()
+    if approximate:
+        # 2.b. Approximate number of unique participants (excluding 'System').
+        # A categorical Sender column is fed once per observed category, not once per message.
+        participant_sketch = sketches.HyperLogLog()
+        if isinstance(chat_df['Sender'].dtype, pd.CategoricalDtype):
+            participants = chat_df['Sender'].cat.remove_unused_categories().cat.categories
+        else:
+            participants = chat_df['Sender']
+        participant_sketch.update_many(sender for sender in participants if sender != 'System')
+        metrics['unique_participants'] = participant_sketch.estimate()
+
+        # 2.c. Approximate messages sent per top participants
+        sender_sketch = sketches.CountMinSketch(top_k=100)
+        sender_sketch.update_many(chat_df['Sender'])
+        messages_per_participant = pd.Series(dict(sender_sketch.most_common()), name='count', dtype='int64')
+        messages_per_participant.index.name = 'Sender'
+        metrics['messages_per_participant'] = messages_per_participant
+        top_senders = [sender for sender in messages_per_participant.index if sender != 'System'][:5]
+    else:
+        # 2.b. Number of unique participants (excluding 'System')
+        metrics['unique_participants'] = chat_df[chat_df['Sender'] != 'System']['Sender'].nunique()
+
+        # 2.c. Messages sent per participant
+        metrics['messages_per_participant'] = chat_df['Sender'].value_counts()
+        top_senders = chat_df[chat_df['Sender'] != 'System']['Sender'].value_counts().head(5).index.tolist()
 
     # 2.d. Busiest hours
     metrics['busiest_hours'] = chat_df['Timestamp'].dt.hour.value_counts()
@@ -40,11 +65,93 @@ def calculate_metrics(chat_df):
     metrics['average_message_length'] = chat_df['Message'].str.len().mean()
 
     # 2.g. Hourly message distribution for top 5 active users (excluding 'System')
-    top_senders = chat_df[chat_df['Sender'] != 'System']['Sender'].value_counts().head(5).index.tolist()
     metrics['hourly_activity_top_senders'] = chat_df[chat_df['Sender'].isin(top_senders)].groupby(['Sender', chat_df['Timestamp'].dt.hour], observed=False).size().unstack(fill_value=0)
 
+    # 2.h. Conversation sessions, response times and streaks
+    metrics.update(calculate_conversation_metrics(chat_df, session_gap_minutes=session_gap_minutes))
+
     return metrics
 
+def calculate_conversation_metrics(chat_df, session_gap_minutes=60):
+    """
+    Calculates conversation session, response-time and streak metrics.
+
+    Messages (excluding 'System') are sorted by timestamp and a new session is
+    started whenever the gap to the previous message exceeds
+    `session_gap_minutes`. All calculations use diff/shift/cumsum over the
+    sorted frame, so they scale linearly with the number of messages.
+    """
+    conversation_metrics = {}
+    session_gap = pd.Timedelta(minutes=session_gap_minutes)
+
+    # i. Keep timestamped, non-system messages in chronological order
+    mask = (chat_df['Sender'] != 'System') & chat_df['Timestamp'].notna()
+    df = chat_df.loc[mask, ['Timestamp', 'Sender']].sort_values('Timestamp', kind='mergesort')
+    timestamps = df['Timestamp'].reset_index(drop=True)
+    senders = df['Sender'].astype(str).astype('category').reset_index(drop=True)
+    sender_codes = pd.Series(senders.cat.codes)
+
+    # ii. Split into sessions wherever the inactivity gap is exceeded
+    gaps = timestamps.diff()
+    new_session = gaps.isna() | (gaps > session_gap)
+    session_id = new_session.cumsum()
+
+    sessions = pd.DataFrame({
+        'Start': timestamps.groupby(session_id).first(),
+        'End': timestamps.groupby(session_id).last(),
+        'Messages': session_id.groupby(session_id).size(),
+        'Participants': sender_codes.groupby(session_id).nunique(),
+    })
+    sessions['Duration (min)'] = (sessions['End'] - sessions['Start']).dt.total_seconds() / 60
+    sessions = sessions.reset_index(drop=True)
+
+    conversation_metrics['total_sessions'] = len(sessions)
+    conversation_metrics['sessions'] = sessions
+    conversation_metrics['average_session_duration'] = sessions['Duration (min)'].mean()
+    conversation_metrics['average_messages_per_session'] = sessions['Messages'].mean()
+
+    # iii. Who starts conversations (first sender of each session)
+    conversation_metrics['conversation_starters'] = senders[new_session].value_counts().loc[lambda counts: counts > 0]
+
+    # iv. Response time: a message replies to the previous one when the sender
+    # changes within the same session
+    previous_senders = senders.shift(1)
+    is_reply = ~new_session & (sender_codes != sender_codes.shift(1))
+    replies = pd.DataFrame({
+        'Responder': senders[is_reply].astype(str),
+        'Replying To': previous_senders[is_reply].astype(str),
+        'Response Time (min)': gaps[is_reply].dt.total_seconds() / 60,
+    })
+    conversation_metrics['median_response_time'] = replies['Response Time (min)'].median()
+    conversation_metrics['median_response_time_per_sender'] = replies.groupby('Responder')['Response Time (min)'].median().sort_values()
+    conversation_metrics['response_time_per_pair'] = (
+        replies.groupby(['Responder', 'Replying To'])['Response Time (min)']
+        .agg(['median', 'count'])
+        .rename(columns={'median': 'Median Response (min)', 'count': 'Replies'})
+        .reset_index()
+        .sort_values('Replies', ascending=False, kind='mergesort')
+        .reset_index(drop=True)
+    )
+
+    # v. Message streaks: consecutive messages by the same sender within a session
+    new_run = new_session | (sender_codes != sender_codes.shift(1))
+    run_id = new_run.cumsum()
+    run_lengths = run_id.groupby(run_id).size()
+    run_senders = senders[new_run].astype(str).to_numpy()
+    conversation_metrics['longest_message_streaks'] = (
+        pd.Series(run_lengths.to_numpy(), index=run_senders)
+        .groupby(level=0).max()
+        .sort_values(ascending=False)
+    )
+
+    # vi. Daily activity streak: longest run of consecutive days with messages
+    active_days = pd.Series(timestamps.dt.normalize().unique())
+    new_day_run = active_days.diff() != pd.Timedelta(days=1)
+    day_run_lengths = new_day_run.cumsum().value_counts()
+    conversation_metrics['longest_daily_streak'] = int(day_run_lengths.max()) if not day_run_lengths.empty else 0
+
+    return conversation_metrics
+
 def preprocess_messages(chat_df):
     """
     Cleans messages in the DataFrame by removing URLs, special characters,
@@ -95,12 +202,13 @@ def preprocess_messages(chat_df):
     # 4.d. Return the chat_df with the new 'Cleaned_Message' column
     return chat_df
 
-def generate_word_cloud(cleaned_messages):
+def generate_word_cloud(cleaned_messages, frequencies=None):
     """
     Generates a word cloud image from cleaned messages.
     Excludes common, less meaningful words like 'media' and 'omitted'.
+    If `frequencies` (a word -> count mapping) is given, it is used instead
+    of joining all messages into a single string.
     """
-    text = " ".join(cleaned_messages)
     # Add 'media' and 'omitted' to stopwords for word cloud generation
     custom_stopwords = set(stopwords.words('english'))
     custom_stopwords.update(['media', 'omitted', 'null', 'nan'])
@@ -110,46 +218,61 @@ def generate_word_cloud(cleaned_messages):
         background_color='white',
         stopwords=custom_stopwords,
         min_font_size=10
-    ).generate(text)
+    )
+    if frequencies is not None:
+        wordcloud.generate_from_frequencies({word: count for word, count in frequencies.items() if word not in custom_stopwords})
+    else:
+        wordcloud.generate(" ".join(cleaned_messages))
 
     return wordcloud.to_image()
 
-def extract_keyphrases(cleaned_messages, top_n=20):
+def extract_keyphrases(cleaned_messages, top_n=20, approximate=False):
     """
     Extracts keyphrases (noun phrases) from cleaned messages.
+    With `approximate=True`, phrases are counted with a Count-Min sketch.
     """
     try:
         nltk.data.find('taggers/averaged_perceptron_tagger_eng')
     except LookupError:
         nltk.download('averaged_perceptron_tagger_eng')
 
-    all_phrases = []
     grammar = r"""
         NP: {<DT|JJ|NN.*>+}
     """
     chunk_parser = nltk.RegexpParser(grammar)
 
-    for message in cleaned_messages:
-        tokens = word_tokenize(message)
-        pos_tags = nltk.pos_tag(tokens)
-        tree = chunk_parser.parse(pos_tags)
-
-        for subtree in tree.subtrees():
-            if subtree.label() == 'NP':
-                phrase = " ".join([word for word, tag in subtree.leaves()])
-                all_phrases.append(phrase)
-
-    # Filter out common, less meaningful phrases
-    filtered_phrases = [phrase for phrase in all_phrases if phrase.lower() not in ['media omitted', 'security code', 'tap learn'] and len(phrase.split()) > 1]
-
-    phrase_freq = Counter(filtered_phrases)
+    def _iter_phrases():
+        for message in cleaned_messages:
+            tokens = word_tokenize(message)
+            pos_tags = nltk.pos_tag(tokens)
+            tree = chunk_parser.parse(pos_tags)
+
+            for subtree in tree.subtrees():
+                if subtree.label() == 'NP':
+                    phrase = " ".join([word for word, tag in subtree.leaves()])
+                    # Filter out common, less meaningful phrases
+                    if phrase.lower() not in ['media omitted', 'security code', 'tap learn'] and len(phrase.split()) > 1:
+                        yield phrase
+
+    if approximate:
+        phrase_freq = sketches.CountMinSketch(top_k=top_n * 5)
+        phrase_freq.update_many(_iter_phrases())
+    else:
+        phrase_freq = Counter(_iter_phrases())
     return pd.DataFrame(phrase_freq.most_common(top_n), columns=['Keyphrase', 'Frequency'])
 
-def perform_topic_modeling(cleaned_messages, num_topics=5):
+def perform_topic_modeling(cleaned_messages, num_topics=5, max_documents=None):
     """
     Performs Latent Dirichlet Allocation (LDA) Topic Modeling on cleaned messages.
+    If `max_documents` is set, LDA is trained on a uniform reservoir sample of
+    at most that many non-empty messages.
     """
-    tokenized_messages = [message.split() for message in cleaned_messages if message.strip()]
+    non_empty_messages = (message for message in cleaned_messages if message.strip())
+    if max_documents is not None:
+        corpus_sample = sketches.ReservoirSample(max_documents)
+        corpus_sample.update_many(non_empty_messages)
+        non_empty_messages = corpus_sample.items
+    tokenized_messages = [message.split() for message in non_empty_messages]
 
     if not tokenized_messages:
         return None
@@ -167,37 +290,59 @@ def perform_topic_modeling(cleaned_messages, num_topics=5):
 
     return pd.DataFrame(topics_data)
 
-def perform_content_analysis(chat_df):
+def perform_content_analysis(chat_df, approximate=False, lda_max_documents=20000):
     """
     Performs content analysis including word frequency, bigram frequency, and sentiment analysis.
+
+    With `approximate=True`, word, bigram and keyphrase counts use Count-Min
+    sketches, the word cloud is built from the sketched top words, and the
+    sentiment samples and LDA corpus are drawn with reservoir sampling, so
+    memory stays bounded however large the chat is.
+
+    The input DataFrame is not modified; per-message sentiment is returned as
+    `message_sentiment`, indexed like `chat_df`.
     """
     content_analysis_results = {}
 
-    # 6.a. Tokenize all cleaned messages
-    all_words = ' '.join(chat_df['Cleaned_Message']).split()
+    if approximate:
+        # 6.a/6.b. Stream tokens into a sketch and return the top 20 words
+        word_freq = sketches.CountMinSketch(top_k=200)
+        word_freq.update_many(chain.from_iterable(message.split() for message in chat_df['Cleaned_Message']))
+        content_analysis_results['top_20_words'] = pd.DataFrame(word_freq.most_common(20), columns=['Word', 'Frequency'])
+
+        # Generate and store word cloud image from the sketched top words
+        content_analysis_results['word_cloud_image'] = generate_word_cloud(chat_df['Cleaned_Message'], frequencies=dict(word_freq.most_common()))
+
+        # 6.c/6.d. Stream bigrams into a sketch and return the top 20 bigrams
+        bigram_freq = sketches.CountMinSketch(top_k=100)
+        bigram_freq.update_many(chain.from_iterable(ngrams(message.split(), 2) for message in chat_df['Cleaned_Message']))
+        content_analysis_results['top_20_bigrams'] = pd.DataFrame(bigram_freq.most_common(20), columns=['Bigram', 'Frequency'])
+    else:
+        # 6.a. Tokenize all cleaned messages
+        all_words = ' '.join(chat_df['Cleaned_Message']).split()
 
-    # 6.b. Calculate and return the top 20 most frequent words
-    word_freq = Counter(all_words)
-    content_analysis_results['top_20_words'] = pd.DataFrame(word_freq.most_common(20), columns=['Word', 'Frequency'])
+        # 6.b. Calculate and return the top 20 most frequent words
+        word_freq = Counter(all_words)
+        content_analysis_results['top_20_words'] = pd.DataFrame(word_freq.most_common(20), columns=['Word', 'Frequency'])
 
-    # Generate and store word cloud image
-    content_analysis_results['word_cloud_image'] = generate_word_cloud(chat_df['Cleaned_Message'])
+        # Generate and store word cloud image
+        content_analysis_results['word_cloud_image'] = generate_word_cloud(chat_df['Cleaned_Message'])
 
-    # 6.c. Generate bigrams from the cleaned messages
-    all_bigrams = []
-    for message in chat_df['Cleaned_Message']:
-        tokens = message.split()
-        all_bigrams.extend(list(ngrams(tokens, 2)))
+        # 6.c. Generate bigrams from the cleaned messages
+        all_bigrams = []
+        for message in chat_df['Cleaned_Message']:
+            tokens = message.split()
+            all_bigrams.extend(list(ngrams(tokens, 2)))
 
-    # 6.d. Calculate and return the top 20 most frequent bigrams
-    bigram_freq = Counter(all_bigrams)
-    content_analysis_results['top_20_bigrams'] = pd.DataFrame(bigram_freq.most_common(20), columns=['Bigram', 'Frequency'])
+        # 6.d. Calculate and return the top 20 most frequent bigrams
+        bigram_freq = Counter(all_bigrams)
+        content_analysis_results['top_20_bigrams'] = pd.DataFrame(bigram_freq.most_common(20), columns=['Bigram', 'Frequency'])
 
     # Extract and store keyphrases
-    content_analysis_results['top_keyphrases'] = extract_keyphrases(chat_df['Cleaned_Message'])
+    content_analysis_results['top_keyphrases'] = extract_keyphrases(chat_df['Cleaned_Message'], approximate=approximate)
 
     # Perform and store topic modeling results
-    content_analysis_results['topic_modeling_results'] = perform_topic_modeling(chat_df['Cleaned_Message'])
+    content_analysis_results['topic_modeling_results'] = perform_topic_modeling(chat_df['Cleaned_Message'], max_documents=lda_max_documents if approximate else None)
 
     # 6.e. Ensure NLTK vader_lexicon is downloaded
     try:
@@ -212,7 +357,7 @@ def perform_content_analysis(chat_df):
         return sia.polarity_scores(text)['compound']
 
     # Apply sentiment analysis
-    chat_df['Sentiment_Score'] = chat_df['Cleaned_Message'].apply(get_sentiment_score)
+    sentiment_scores = chat_df['Cleaned_Message'].apply(get_sentiment_score)
 
     # Categorize sentiment
     def categorize_sentiment(score):
@@ -223,12 +368,25 @@ def perform_content_analysis(chat_df):
         else:
             return 'Neutral'
 
-    chat_df['Sentiment'] = chat_df['Sentiment_Score'].apply(categorize_sentiment)
+    sentiments = sentiment_scores.apply(categorize_sentiment)
+    content_analysis_results['message_sentiment'] = pd.DataFrame({'Sentiment_Score': sentiment_scores, 'Sentiment': sentiments})
 
     # 6.g. Return the sentiment distribution and sample messages
-    content_analysis_results['sentiment_distribution'] = chat_df['Sentiment'].value_counts()
-    content_analysis_results['sample_positive_messages'] = chat_df[chat_df['Sentiment'] == 'Positive']['Message'].head(5)
-    content_analysis_results['sample_negative_messages'] = chat_df[chat_df['Sentiment'] == 'Negative']['Message'].head(5)
-    content_analysis_results['sample_neutral_messages'] = chat_df[chat_df['Sentiment'] == 'Neutral']['Message'].head(5)
+    content_analysis_results['sentiment_distribution'] = sentiments.rename('Sentiment').value_counts()
+    if approximate:
+        # Uniform reservoir sample of 5 messages per sentiment in a single pass
+        samples = {sentiment: sketches.ReservoirSample(5) for sentiment in ['Positive', 'Negative', 'Neutral']}
+        for index, sentiment, message in zip(chat_df.index, sentiments, chat_df['Message']):
+            samples[sentiment].update((index, message))
+        for sentiment, sample in samples.items():
+            content_analysis_results[f'sample_{sentiment.lower()}_messages'] = pd.Series(
+                [message for _, message in sample.items],
+                index=[index for index, _ in sample.items],
+                name='Message', dtype='string'
+            )
+    else:
+        content_analysis_results['sample_positive_messages'] = chat_df.loc[sentiments == 'Positive', 'Message'].head(5)
+        content_analysis_results['sample_negative_messages'] = chat_df.loc[sentiments == 'Negative', 'Message'].head(5)
+        content_analysis_results['sample_neutral_messages'] = chat_df.loc[sentiments == 'Neutral', 'Message'].head(5)
 
     return content_analysis_results
\ No newline at end of file